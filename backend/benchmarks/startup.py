@@ -0,0 +1,98 @@
+"""Worker cold-start benchmark.
+
+Starts fresh interpreters that create the app and serve /api/health and
+/api/status. Elapsed time runs from just before the interpreter is launched
+until the second response, so interpreter startup is included; process
+teardown is not. One extra run with ``-X importtime`` lists the heaviest
+packages (it is not timed, since importtime slows imports down).
+``--with-agent`` also loads the research agent stack, which is what startup
+used to cost before it was made lazy.
+
+    python benchmarks/startup.py --repeat 5
+    python benchmarks/startup.py --with-agent
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STARTUP_CODE = '''
+import time
+from src.main import create_app
+app = create_app({{'SQLALCHEMY_DATABASE_URI': 'sqlite://'}})
+client = app.test_client()
+assert client.get('/api/health').status_code == 200
+assert client.get('/api/status').status_code == 200
+if {with_agent}:
+    from src.routes.research import load_agent_class
+    load_agent_class(None)
+print(f"READY {{time.time():.6f}}")
+'''
+
+IMPORT_LINE = re.compile(r'import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def run_startup(with_agent, importtime=False):
+    """Run the startup script in a fresh interpreter and return the CompletedProcess"""
+    env = dict(os.environ, PREWARM_AGENT='0')
+    args = [sys.executable] + (['-X', 'importtime'] if importtime else [])
+    proc = subprocess.run(
+        args + ['-c', STARTUP_CODE.format(with_agent=with_agent)],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"startup failed:\n{proc.stderr[-2000:]}")
+    return proc
+
+
+def time_startup(with_agent):
+    """Seconds from launching the interpreter until both status endpoints answered"""
+    start = time.time()
+    proc = run_startup(with_agent)
+    return float(re.search(r'READY ([\d.]+)', proc.stdout).group(1)) - start
+
+
+def import_costs(with_agent):
+    """Return (total import microseconds, {top-level package: cumulative microseconds})"""
+    proc = run_startup(with_agent, importtime=True)
+    total, packages = 0, {}
+    for line in proc.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if not match:
+            continue
+        cumulative, module = int(match.group(2)), match.group(4)
+        # Outermost imports already include everything they pull in
+        if len(match.group(3)) == 1:
+            total += cumulative
+        # Cost of each top-level package, wherever it was first imported from
+        if '.' not in module and module != 'src':
+            packages[module] = cumulative
+    return total, packages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=3, help='number of cold starts to measure')
+    parser.add_argument('--top', type=int, default=10, help='number of heaviest imports to list')
+    parser.add_argument('--with-agent', action='store_true', help='also import the research agent stack')
+    args = parser.parse_args()
+
+    elapsed = [time_startup(args.with_agent) for _ in range(args.repeat)]
+    total, packages = import_costs(args.with_agent)
+
+    print(f"Interpreter launch to first /api/status ({args.repeat} runs): "
+          f"median {statistics.median(elapsed) * 1000:.0f} ms, "
+          f"min {min(elapsed) * 1000:.0f} ms, max {max(elapsed) * 1000:.0f} ms")
+    print(f"Total import time (under -X importtime): {total / 1000:.0f} ms")
+    print("Heaviest packages:")
+    for module, cumulative in sorted(packages.items(), key=lambda i: i[1], reverse=True)[:args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {module}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,26 +1,35 @@
 import time
 import re
-import requests
-from bs4 import BeautifulSoup
-from openai import OpenAI
 import os
 import google.generativeai as genai
 from src.search import SearchEngine, WebScraper
+from src.cancellation import CancelToken, TaskCancelled, StageTimeout
+from src.planner import AdaptivePlanner, ResearchBudget, WIDE_RESULTS, estimate_tokens
 
 # Global socketio instance will be set by main app
 socketio = None
 
+# Deadlines in seconds; 0 disables the corresponding limit
+TASK_TIMEOUT = float(os.environ.get('RESEARCH_TASK_TIMEOUT', 900))
+PLAN_TIMEOUT = float(os.environ.get('RESEARCH_PLAN_TIMEOUT', 60))
+SUB_QUESTION_TIMEOUT = float(os.environ.get('RESEARCH_SUB_QUESTION_TIMEOUT', 180))
+REPORT_TIMEOUT = float(os.environ.get('RESEARCH_REPORT_TIMEOUT', 180))
+LLM_TIMEOUT = float(os.environ.get('RESEARCH_LLM_TIMEOUT', 90))
+
 def set_socketio(socketio_instance):
     global socketio
     socketio = socketio_instance
 
 class ResearchAgent:
-    def __init__(self, task_id):
+    def __init__(self, task_id, cancel_token=None):
         self.task_id = task_id
+        self.cancel_token = cancel_token or CancelToken(TASK_TIMEOUT)
         self.status = 'initialized'
         self.thoughts = []
         self.report = ''
         self.progress = 0
+        self.budget = ResearchBudget()
+        self.planner = AdaptivePlanner(self.budget)
         try:
             api_key = os.environ.get("GEMINI_API_KEY")
             if not api_key:
@@ -30,8 +39,23 @@ class ResearchAgent:
             self.genai_model = genai.GenerativeModel('gemini-1.5-flash')
         except Exception as e:
             raise Exception("Failed to configure Gemini API. Make sure you have GEMINI_API_KEY set.")
-        self.search_engine = SearchEngine()
-        self.web_scraper = WebScraper()
+        self.search_engine = SearchEngine(cancel_token=self.cancel_token, budget=self.budget)
+        self.web_scraper = WebScraper(cancel_token=self.cancel_token)
+    
+    def cancel(self, reason='cancelled'):
+        """Request cooperative cancellation; the research thread stops at its next check"""
+        return self.cancel_token.cancel(reason)
+    
+    def generate(self, prompt):
+        """Call Gemini, giving up as soon as the task is cancelled or out of time"""
+        timeout = self.cancel_token.timeout(LLM_TIMEOUT)
+        response = self.cancel_token.call(
+            self.genai_model.generate_content, prompt, request_options={'timeout': timeout}
+        )
+        usage = getattr(response, 'usage_metadata', None)
+        tokens = getattr(usage, 'total_token_count', 0) if usage else 0
+        self.budget.record_llm(tokens or estimate_tokens(prompt) + estimate_tokens(response.text))
+        return response.text
         
     def add_thought(self, thought):
         """Add a thought and emit it via WebSocket"""
@@ -55,23 +79,36 @@ class ResearchAgent:
             
             # Step 1: Break down the query into sub-questions
             self.add_thought("Breaking down the query into sub-questions...")
-            sub_questions = self.break_down_query(query)
+            with self.cancel_token.stage_limit('planning', PLAN_TIMEOUT):
+                sub_questions = self.break_down_query(query)
             self.update_progress(10)
             
             # Step 2: Research each sub-question
             all_findings = []
             for i, sub_question in enumerate(sub_questions):
-                self.add_thought(f"Researching: {sub_question}")
-                findings = self.research_sub_question(sub_question)
-                all_findings.extend(findings)
+                self.cancel_token.check()
+                if not self.budget.can_search():
+                    self.add_thought("Search budget used up, moving on to the report")
+                    break
+                if all_findings and self.planner.is_covered(sub_question, all_findings, query):
+                    self.add_thought(f"Already covered by earlier findings, skipping: {sub_question}")
+                else:
+                    self.add_thought(f"Researching: {sub_question}")
+                    with self.cancel_token.stage_limit('research', SUB_QUESTION_TIMEOUT):
+                        findings = self.research_sub_question(sub_question, query)
+                    all_findings.extend(findings)
                 progress = 10 + (70 * (i + 1) / len(sub_questions))
                 self.update_progress(int(progress))
                 
             # Step 3: Compile final report
+            self.cancel_token.check()
             self.add_thought("Compiling final report...")
-            self.report = self.compile_report(query, sub_questions, all_findings)
+            with self.cancel_token.stage_limit('report', REPORT_TIMEOUT):
+                self.report = self.compile_report(query, sub_questions, all_findings)
             self.update_progress(100)
             
+            cost = self.budget
+            self.add_thought(f"Research cost: {cost.searches} searches, {cost.scrapes} pages scraped, ~{cost.llm_tokens} LLM tokens")
             self.status = 'completed'
             self.add_thought("Research completed successfully!")
             
@@ -82,6 +119,17 @@ class ResearchAgent:
                     'report': self.report
                 }, room=self.task_id)
             
+        except TaskCancelled as e:
+            timed_out = isinstance(e, StageTimeout) or e.reason == 'timeout'
+            self.status = 'timeout' if timed_out else 'cancelled'
+            self.add_thought(f"Research stopped: {e.reason}")
+            if socketio:
+                socketio.emit('cancelled', {
+                    'task_id': self.task_id,
+                    'status': self.status,
+                    'reason': e.reason
+                }, room=self.task_id)
+            
         except Exception as e:
             self.status = 'error'
             self.add_thought(f"Error occurred: {str(e)}")
@@ -90,58 +138,94 @@ class ResearchAgent:
     
     def break_down_query(self, query):
         """Break down the main query into sub-questions using OpenAI"""
+        max_questions = self.planner.max_sub_questions(query)
         try:
             prompt = f"""
-            Break down this research query into 3-5 specific sub-questions that would help gather comprehensive information:
+            Break down this research query into at most {max_questions} specific sub-questions that would help gather comprehensive information.
+            Use fewer sub-questions for simple or narrow queries; do not ask overlapping questions.
             
             Query: {query}
             
             Return only the sub-questions, one per line, without numbering or bullet points.
             """
             
-            response = self.genai_model.generate_content(prompt)
+            response_text = self.generate(prompt)
             
-            sub_questions = [q.strip() for q in response.text.strip().split('\n') if q.strip()]
+            sub_questions = [q.strip() for q in response_text.strip().split('\n') if q.strip()][:max_questions]
             
             for i, question in enumerate(sub_questions, 1):
                 self.add_thought(f"Sub-question {i}: {question}")
                 
             return sub_questions
             
+        except StageTimeout:
+            self.add_thought("Query breakdown took too long, using default sub-questions")
+            return self._fallback_sub_questions(query)[:max_questions]
         except Exception as e:
             if 'quota' in str(e).lower():
                 raise Exception("Gemini API quota exceeded. Please check your plan and billing details.")
             self.add_thought(f"Error breaking down query: {str(e)}")
-            # Fallback to basic sub-questions
-            return [
-                f"What are the key players in {query}?",
-                f"What are the recent trends in {query}?",
-                f"What are the main challenges in {query}?"
-            ]
+            return self._fallback_sub_questions(query)[:max_questions]
+    
+    def _fallback_sub_questions(self, query):
+        """Basic sub-questions used when the LLM breakdown is unavailable"""
+        return [
+            f"What are the key players in {query}?",
+            f"What are the recent trends in {query}?",
+            f"What are the main challenges in {query}?"
+        ]
     
-    def research_sub_question(self, sub_question):
+    def research_sub_question(self, sub_question, query=''):
         """Research a single sub-question"""
         findings = []
         
         try:
             # Perform real search
             self.add_thought(f"Searching for: {sub_question}")
-            search_results = self.search_engine.search(sub_question, num_results=3)
+            # Parse the results page deeply once; the best few are picked by relevance below
+            search_results = self.cancel_token.call(self.search_engine.search, sub_question, num_results=WIDE_RESULTS)
+            
+            # Only weak sub-questions get a second, reformulated search
+            reformulated = self.planner.reformulate(sub_question, query)
+            if (search_results and reformulated and self.budget.can_search()
+                    and self.planner.is_weak(sub_question, search_results)):
+                self.add_thought(f"Results look weak, searching again for: {reformulated}")
+                wider_results = self.cancel_token.call(self.search_engine.search, reformulated, num_results=WIDE_RESULTS)
+                search_results = self.planner.merge(search_results, [r for r in wider_results if not r.get('fallback')])
             
             if not search_results:
                 self.add_thought("No search results found, using fallback data")
                 return [{
                     'source': 'Fallback Data',
                     'url': 'N/A',
-                    'summary': f"Unable to find specific information about: {sub_question}. This would typically contain relevant market data, industry insights, and expert analysis."
+                    'summary': f"Unable to find specific information about: {sub_question}. This would typically contain relevant market data, industry insights, and expert analysis.",
+                    'synthetic': True
                 }]
             
+            search_results = self.planner.rank(sub_question, search_results)
+            
+            if self.planner.snippets_answer(sub_question, search_results):
+                self.add_thought("Search snippets already answer this sub-question, skipping scraping")
+                return [self._snippet_finding(result) for result in search_results]
+            
             # Scrape top results
             for i, result in enumerate(search_results, 1):
+                self.cancel_token.check()
+                
+                if self.planner.snippet_is_enough(sub_question, result):
+                    self.add_thought(f"Snippet is sufficient for result {i}: {result['title']}")
+                    findings.append(self._snippet_finding(result))
+                    continue
+                if not self.budget.can_scrape() or not self.budget.can_summarize():
+                    self.add_thought(f"Budget used up, using search snippet for {result['title']}")
+                    findings.append(self._snippet_finding(result))
+                    continue
+                
                 self.add_thought(f"Scraping result {i}: {result['title']}")
                 
                 # Scrape the webpage
-                scraped_content = self.web_scraper.scrape_url(result['url'])
+                self.budget.record_scrape()
+                scraped_content = self.cancel_token.call(self.web_scraper.scrape_url, result['url'])
                 
                 if scraped_content and len(scraped_content) > 100:
                     # Summarize the scraped content
@@ -149,28 +233,44 @@ class ResearchAgent:
                     findings.append({
                         'source': result['title'],
                         'url': result['url'],
-                        'summary': summary
+                        'summary': summary,
+                        'synthetic': result.get('fallback', False)
                     })
                 else:
                     # Use the search snippet if scraping failed
-                    self.add_thought(f"Scraping failed for {result['title']}, using search snippet")
-                    findings.append({
-                        'source': result['title'],
-                        'url': result['url'],
-                        'summary': result.get('snippet', 'No content available')
-                    })
+                    self.add_thought(f"No usable summary for {result['title']}, using search snippet")
+                    findings.append(self._snippet_finding(result))
                     
+        except StageTimeout:
+            self.add_thought(f"Time limit reached for this sub-question, keeping {len(findings)} finding(s)")
+            if not findings:
+                findings.append({
+                    'source': 'Timeout',
+                    'url': 'N/A',
+                    'summary': f"Research on this sub-question was cut short by its time limit: {sub_question}.",
+                    'synthetic': True
+                })
         except Exception as e:
             self.add_thought(f"Error researching sub-question: {str(e)}")
             # Provide fallback finding
             findings.append({
                 'source': 'Error Recovery',
                 'url': 'N/A',
-                'summary': f"Research encountered an error for: {sub_question}. This would typically include relevant information from industry sources and expert analysis."
+                'summary': f"Research encountered an error for: {sub_question}. This would typically include relevant information from industry sources and expert analysis.",
+                'synthetic': True
             })
             
         return findings
     
+    def _snippet_finding(self, result):
+        """Finding built from a search result's snippet instead of its page"""
+        return {
+            'source': result['title'],
+            'url': result['url'],
+            'summary': result.get('snippet', 'No content available'),
+            'synthetic': result.get('fallback', False)
+        }
+    
     def summarize_content(self, content, context):
         """Summarize scraped content using OpenAI"""
         try:
@@ -182,9 +282,7 @@ class ResearchAgent:
             Provide a concise summary focusing on the most relevant information for the research question.
             """
             
-            response = self.genai_model.generate_content(prompt)
-            
-            return response.text.strip()
+            return self.generate(prompt).strip()
             
         except Exception as e:
             if 'quota' in str(e).lower():
@@ -249,13 +347,31 @@ class ResearchAgent:
             Now, please generate the complete, professional report.
             """
             
-            response = self.genai_model.generate_content(prompt)
-            
-            return response.text.strip()
+            return self.generate(prompt).strip()
             
+        except StageTimeout:
+            self.add_thought("Report compilation took too long, returning the raw findings instead")
+            return self._findings_report(original_query, sub_questions, findings)
         except Exception as e:
             if 'quota' in str(e).lower():
                 return "Report compilation failed. API quota exceeded. Please check your plan and billing details."
             self.add_thought(f"Error compiling report: {str(e)}")
             return "Report compilation failed due to processing error."
+    
+    def _findings_report(self, original_query, sub_questions, findings):
+        """Plain Markdown listing of the findings, used when the AI report can't be compiled in time"""
+        lines = [
+            f"# Research Findings: {original_query}",
+            "",
+            "*The full report could not be compiled within the time limit. These are the findings gathered so far.*",
+            "",
+            "## Research Questions",
+        ]
+        lines += [f"* {q}" for q in sub_questions]
+        lines += ["", "## Findings"]
+        for finding in findings:
+            if finding.get('synthetic'):
+                continue
+            lines += ["", f"### {finding['source']}", finding['url'], "", finding['summary']]
+        return '\n'.join(lines)
 
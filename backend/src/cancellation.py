@@ -0,0 +1,133 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# How often blocking calls wake up to check whether the task was cancelled
+POLL_INTERVAL = 0.25
+
+
+class TaskCancelled(BaseException):
+    """Raised inside a research task once it has been cancelled.
+
+    Derives from BaseException (like asyncio.CancelledError) so that the
+    agent's broad ``except Exception`` recovery blocks don't swallow it.
+    """
+
+    def __init__(self, reason='cancelled'):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class StageTimeout(TaskCancelled):
+    """Raised when the current stage ran past its own deadline.
+
+    Unlike a plain TaskCancelled the task itself is still alive, so callers
+    may catch this and continue with partial results.
+    """
+
+    def __init__(self, stage):
+        super().__init__(f"stage '{stage}' timed out")
+        self.stage = stage
+
+
+class CancelToken:
+    """Cooperative cancellation flag with an optional task and stage deadline"""
+
+    def __init__(self, timeout=None):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+        self.reason = None
+        self.deadline = time.monotonic() + timeout if timeout else None
+        self.stage = None
+        self.stage_deadline = None
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self, reason='cancelled'):
+        """Cancel the task and abort in-flight work. Returns False if already cancelled."""
+        with self._lock:
+            if self._event.is_set():
+                return False
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Error in cancel callback: {e}")
+        return True
+
+    def on_cancel(self, callback):
+        """Register a callback (e.g. closing an HTTP session) to run on cancel"""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def check(self):
+        """Raise if the task was cancelled or a deadline has passed"""
+        if self._event.is_set():
+            raise TaskCancelled(self.reason)
+        now = time.monotonic()
+        if self.deadline is not None and now >= self.deadline:
+            self.cancel('timeout')
+            raise TaskCancelled(self.reason)
+        if self.stage_deadline is not None and now >= self.stage_deadline:
+            raise StageTimeout(self.stage)
+
+    def remaining(self):
+        """Seconds left before the nearest deadline, or None if unbounded"""
+        deadlines = [d for d in (self.deadline, self.stage_deadline) if d is not None]
+        if not deadlines:
+            return None
+        return max(0.0, min(deadlines) - time.monotonic())
+
+    def timeout(self, default):
+        """Clamp a network timeout so it never outlives the nearest deadline"""
+        self.check()
+        remaining = self.remaining()
+        if remaining is None:
+            return default
+        return max(0.1, min(default, remaining))
+
+    @contextmanager
+    def stage_limit(self, stage, timeout):
+        """Run a block with its own deadline on top of the task deadline"""
+        previous = (self.stage, self.stage_deadline)
+        self.stage = stage
+        self.stage_deadline = time.monotonic() + timeout if timeout else None
+        try:
+            yield self
+        finally:
+            self.stage, self.stage_deadline = previous
+
+    def call(self, fn, *args, **kwargs):
+        """Run a blocking call in a helper thread and stop waiting on it as
+        soon as the token is cancelled or a deadline passes.
+
+        The abandoned call is left to finish on its own daemon thread; its
+        result is discarded.
+        """
+        self.check()
+        outcome = {}
+        done = threading.Event()
+
+        def runner():
+            try:
+                outcome['value'] = fn(*args, **kwargs)
+            except BaseException as e:
+                outcome['error'] = e
+            finally:
+                done.set()
+
+        threading.Thread(target=runner, daemon=True).start()
+        while not done.wait(POLL_INTERVAL):
+            self.check()
+        if 'error' in outcome:
+            raise outcome['error']
+        return outcome['value']
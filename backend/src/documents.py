@@ -0,0 +1,385 @@
+import hashlib
+import math
+import multiprocessing
+import os
+import re
+import signal
+import tempfile
+import threading
+import zipfile
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+# Limits in bytes, pages (PDF pages, spreadsheet sheets or slides) and seconds
+MAX_BYTES = int(os.environ.get('DOCUMENT_MAX_BYTES', 20 * 1024 * 1024))
+MAX_PAGES = int(os.environ.get('DOCUMENT_MAX_PAGES', 30))
+MAX_CHARS = int(os.environ.get('DOCUMENT_MAX_CHARS', 20000))
+EXTRACT_TIMEOUT = float(os.environ.get('DOCUMENT_TIMEOUT', 30))
+MAX_WORKERS = int(os.environ.get('DOCUMENT_WORKERS', 2))
+# Workers are replaced after this many documents so parser memory doesn't pile up
+TASKS_PER_WORKER = int(os.environ.get('DOCUMENT_TASKS_PER_WORKER', 10))
+CACHE_SIZE = int(os.environ.get('DOCUMENT_CACHE_SIZE', 128))
+
+# Office files are zip archives; refuse archives that inflate far beyond the download limit
+MAX_UNCOMPRESSED_BYTES = MAX_BYTES * 10
+
+POLL_INTERVAL = 0.25
+
+# Workers stop themselves with SIGALRM where it exists (not on Windows)
+HAS_ALARM = hasattr(signal, 'SIGALRM')
+
+CONTENT_TYPES = {
+    'application/pdf': 'pdf',
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document': 'docx',
+    'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet': 'xlsx',
+    'application/vnd.openxmlformats-officedocument.presentationml.presentation': 'pptx',
+    'text/plain': 'text',
+    'text/csv': 'text',
+    'text/markdown': 'text',
+    'application/json': 'text',
+}
+
+EXTENSIONS = {
+    '.pdf': 'pdf',
+    '.docx': 'docx',
+    '.xlsx': 'xlsx',
+    '.pptx': 'pptx',
+    '.txt': 'text',
+    '.csv': 'text',
+    '.md': 'text',
+    '.json': 'text',
+}
+
+# OOXML namespaces
+W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+S_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+A_NS = '{http://schemas.openxmlformats.org/drawingml/2006/main}'
+
+
+class DocumentExtractionError(Exception):
+    """Raised when a document is too large, unsupported or cannot be parsed"""
+
+
+def detect_kind(url='', content_type=''):
+    """Work out the document kind from a content type, falling back to the URL extension"""
+    content_type = content_type.split(';')[0].strip().lower()
+    if content_type in CONTENT_TYPES:
+        return CONTENT_TYPES[content_type]
+    path = url.lower().split('?')[0].split('#')[0]
+    for ext, kind in EXTENSIONS.items():
+        if path.endswith(ext):
+            return kind
+    return None
+
+
+# --- Extraction (runs inside worker processes) ---
+
+def _on_alarm(signum, frame):
+    raise TimeoutError("document extraction timed out")
+
+
+def _check_zip(archive):
+    total = sum(info.file_size for info in archive.infolist())
+    if total > MAX_UNCOMPRESSED_BYTES:
+        raise DocumentExtractionError("archive expands beyond the size limit")
+
+
+def _collect(parts, max_chars):
+    """Join extracted text parts, stopping once max_chars is reached"""
+    text = re.sub(r'[ \t]+', ' ', '\n'.join(p for p in parts if p)).strip()
+    return text[:max_chars]
+
+
+def _extract_pdf(path, max_pages, max_chars):
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise DocumentExtractionError("PDF extraction requires the pypdf package")
+    reader = PdfReader(path)
+    if reader.is_encrypted and not reader.decrypt(''):
+        raise DocumentExtractionError("PDF is password protected")
+    parts, length = [], 0
+    for page in reader.pages[:max_pages]:
+        text = page.extract_text() or ''
+        parts.append(text)
+        length += len(text)
+        if length >= max_chars:
+            break
+    return _collect(parts, max_chars)
+
+
+def _extract_docx(path, max_pages, max_chars):
+    with zipfile.ZipFile(path) as archive:
+        _check_zip(archive)
+        root = ET.fromstring(archive.read('word/document.xml'))
+    parts, length = [], 0
+    for paragraph in root.iter(f'{W_NS}p'):
+        text = ''.join(node.text or '' for node in paragraph.iter(f'{W_NS}t'))
+        parts.append(text)
+        length += len(text)
+        if length >= max_chars:
+            break
+    return _collect(parts, max_chars)
+
+
+def _extract_xlsx(path, max_pages, max_chars):
+    with zipfile.ZipFile(path) as archive:
+        _check_zip(archive)
+        names = archive.namelist()
+        shared = []
+        if 'xl/sharedStrings.xml' in names:
+            for item in ET.fromstring(archive.read('xl/sharedStrings.xml')).iter(f'{S_NS}si'):
+                shared.append(''.join(node.text or '' for node in item.iter(f'{S_NS}t')))
+        sheets = sorted(
+            (n for n in names if re.fullmatch(r'xl/worksheets/sheet\d+\.xml', n)),
+            key=lambda n: int(re.search(r'(\d+)\.xml$', n).group(1))
+        )
+        parts, length = [], 0
+        for name in sheets[:max_pages]:
+            for row in ET.fromstring(archive.read(name)).iter(f'{S_NS}row'):
+                cells = []
+                for cell in row.iter(f'{S_NS}c'):
+                    if cell.get('t') == 'inlineStr':
+                        cells.append(''.join(node.text or '' for node in cell.iter(f'{S_NS}t')))
+                        continue
+                    value = cell.find(f'{S_NS}v')
+                    if value is None or value.text is None:
+                        continue
+                    if cell.get('t') == 's':
+                        index = int(value.text)
+                        cells.append(shared[index] if index < len(shared) else '')
+                    else:
+                        cells.append(value.text)
+                line = ' | '.join(c for c in cells if c)
+                parts.append(line)
+                length += len(line)
+                if length >= max_chars:
+                    return _collect(parts, max_chars)
+    return _collect(parts, max_chars)
+
+
+def _extract_pptx(path, max_pages, max_chars):
+    with zipfile.ZipFile(path) as archive:
+        _check_zip(archive)
+        slides = sorted(
+            (n for n in archive.namelist() if re.fullmatch(r'ppt/slides/slide\d+\.xml', n)),
+            key=lambda n: int(re.search(r'(\d+)\.xml$', n).group(1))
+        )
+        parts, length = [], 0
+        for name in slides[:max_pages]:
+            root = ET.fromstring(archive.read(name))
+            for paragraph in root.iter(f'{A_NS}p'):
+                text = ''.join(node.text or '' for node in paragraph.iter(f'{A_NS}t'))
+                parts.append(text)
+                length += len(text)
+            if length >= max_chars:
+                break
+    return _collect(parts, max_chars)
+
+
+def _extract_text(path, max_pages, max_chars):
+    with open(path, 'rb') as f:
+        data = f.read(max_chars * 4)
+    return _collect([data.decode('utf-8', errors='replace')], max_chars)
+
+
+EXTRACTORS = {
+    'pdf': _extract_pdf,
+    'docx': _extract_docx,
+    'xlsx': _extract_xlsx,
+    'pptx': _extract_pptx,
+    'text': _extract_text,
+}
+
+
+def _extract_in_worker(path, kind, max_pages, max_chars, timeout):
+    """Worker entry point; enforces the time limit inside the worker process too"""
+    if HAS_ALARM:
+        signal.signal(signal.SIGALRM, _on_alarm)
+        signal.alarm(max(1, math.ceil(timeout)))
+    try:
+        return EXTRACTORS[kind](path, max_pages, max_chars)
+    finally:
+        if HAS_ALARM:
+            signal.alarm(0)
+
+
+# --- Shared process pool and cache ---
+
+_pool = None
+_pool_lock = threading.Lock()
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _start_method():
+    # Never fork: the server process is running Socket.IO and research threads.
+    # forkserver is unavailable on Windows, where spawn is the only option.
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        return 'forkserver'
+    return 'spawn'
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=MAX_WORKERS,
+                mp_context=multiprocessing.get_context(_start_method()),
+                max_tasks_per_child=TASKS_PER_WORKER
+            )
+        return _pool
+
+
+def _replace_broken_pool(broken):
+    """Drop a pool after one of its workers died; its futures have already failed"""
+    global _pool
+    with _pool_lock:
+        if _pool is broken:
+            _pool = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def _retire_pool(stuck):
+    """Stop handing new documents to a pool with a runaway worker.
+
+    Only used where workers can't stop themselves (no SIGALRM). Work already
+    queued on the old pool still finishes; the stuck worker exits whenever
+    its document is done.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is stuck:
+            _pool = None
+    stuck.shutdown(wait=False)
+
+
+def _cache_get(key):
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+    return None
+
+
+def _cache_put(key, text):
+    with _cache_lock:
+        _cache[key] = text
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+class DocumentExtractor:
+    """Extracts text from PDF and Office documents in a bounded process pool.
+
+    Parsing runs in separate processes so large documents don't hold the GIL
+    while other research tasks are scraping. Results are cached by content hash.
+    """
+
+    def __init__(self, cancel_token=None, max_bytes=MAX_BYTES, max_pages=MAX_PAGES,
+                 max_chars=MAX_CHARS, timeout=EXTRACT_TIMEOUT):
+        self.cancel_token = cancel_token
+        self.max_bytes = max_bytes
+        self.max_pages = max_pages
+        self.max_chars = max_chars
+        self.timeout = timeout
+
+    def extract_response(self, response, kind):
+        """Stream a (stream=True) HTTP response to a temp file and extract its text"""
+        declared = response.headers.get('content-length')
+        if declared and declared.isdigit() and int(declared) > self.max_bytes:
+            response.close()
+            raise DocumentExtractionError(f"document is larger than {self.max_bytes} bytes")
+
+        digest = hashlib.sha256()
+        fd, path = tempfile.mkstemp(suffix=f'.{kind}')
+        try:
+            size = 0
+            with os.fdopen(fd, 'wb') as f, response:
+                for chunk in response.iter_content(chunk_size=65536):
+                    if self.cancel_token:
+                        self.cancel_token.check()
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        raise DocumentExtractionError(f"document is larger than {self.max_bytes} bytes")
+                    digest.update(chunk)
+                    f.write(chunk)
+            return self._extract(path, kind, digest.hexdigest())
+        finally:
+            os.remove(path)
+
+    def extract_file(self, path, kind=None):
+        """Extract text from a local file, e.g. a fixture or an uploaded document"""
+        kind = kind or detect_kind(path)
+        if kind not in EXTRACTORS:
+            raise DocumentExtractionError(f"unsupported document type: {path}")
+        if os.path.getsize(path) > self.max_bytes:
+            raise DocumentExtractionError(f"document is larger than {self.max_bytes} bytes")
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(65536), b''):
+                digest.update(chunk)
+        return self._extract(path, kind, digest.hexdigest())
+
+    def _extract(self, path, kind, content_hash):
+        key = (content_hash, kind, self.max_pages, self.max_chars)
+        cached = _cache_get(key)
+        if cached is not None:
+            return cached
+
+        if kind == 'text':
+            # Decoding plain text is cheap; not worth a round trip to the pool
+            text = _extract_text(path, self.max_pages, self.max_chars)
+        else:
+            text = self._run_in_pool(path, kind)
+
+        _cache_put(key, text)
+        return text
+
+    def _run_in_pool(self, path, kind):
+        args = (_extract_in_worker, path, kind, self.max_pages, self.max_chars, self.timeout)
+        pool = _get_pool()
+        try:
+            future = pool.submit(*args)
+        except BrokenProcessPool:
+            # A previous worker crashed; start over with a fresh pool
+            _replace_broken_pool(pool)
+            pool = _get_pool()
+            future = pool.submit(*args)
+
+        # The worker enforces the time limit itself with SIGALRM. Killing a single
+        # worker would break the whole pool and every other task's extraction, so
+        # past the grace period we just stop waiting and let the alarm clean up.
+        # Without SIGALRM the limit is only enforced by this wait, and the pool is
+        # retired so the runaway worker can't hold up later documents.
+        waited, limit = 0.0, self.timeout + 5
+        while not wait([future], timeout=POLL_INTERVAL).done:
+            waited += POLL_INTERVAL
+            if self.cancel_token:
+                try:
+                    self.cancel_token.check()
+                except BaseException:
+                    future.cancel()
+                    raise
+            if waited >= limit:
+                if not HAS_ALARM:
+                    _retire_pool(pool)
+                raise DocumentExtractionError("document extraction timed out")
+
+        try:
+            return future.result()
+        except DocumentExtractionError:
+            raise
+        except TimeoutError:
+            raise DocumentExtractionError("document extraction timed out")
+        except BrokenProcessPool:
+            _replace_broken_pool(pool)
+            raise DocumentExtractionError(f"worker crashed while extracting {kind} document")
+        except (zipfile.BadZipFile, ET.ParseError, KeyError) as e:
+            raise DocumentExtractionError(f"malformed {kind} document: {e}")
+        except Exception as e:
+            raise DocumentExtractionError(f"could not extract {kind} document: {e}")
@@ -3,41 +3,67 @@ import sys
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory
+from flask import Flask, send_from_directory, request, current_app
 from flask_socketio import SocketIO, join_room, leave_room
 from flask_cors import CORS
 from src.models.user import db
 from src.routes.user import user_bp
-from src.routes.research import research_bp
+from src.routes.health import health_bp
+from src.routes.research import (
+    research_bp, subscribe_client, unsubscribe_client,
+    unsubscribe_client_everywhere, start_idle_reaper, load_agent_class
+)
 from dotenv import load_dotenv
 
 load_dotenv()
 
-app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
-app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
+socketio = SocketIO()
 
-# Enable CORS for all routes
-CORS(app, origins="*")
+def create_app(config=None):
+    """Application factory.
 
-# Initialize SocketIO
-socketio = SocketIO(app, cors_allowed_origins="*")
+    Kept cheap so a worker can answer /api/health and /api/status quickly:
+    the LLM and scraping stack is imported when the first task starts, and
+    database tables are created on first use of the user API. Set
+    PREWARM_AGENT=1 to load the agent stack in the background right away.
+    ``config`` overrides settings, e.g. SQLALCHEMY_DATABASE_URI in tests.
+    """
+    app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
+    app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
 
-# Set socketio instance in agent module
-from src.agent import set_socketio
-set_socketio(socketio)
+    # Enable CORS for all routes
+    CORS(app, origins="*")
 
-app.register_blueprint(user_bp, url_prefix='/api')
-app.register_blueprint(research_bp, url_prefix='/api')
+    # Initialize SocketIO
+    socketio.init_app(app, cors_allowed_origins="*")
 
-# uncomment if you need to use database
-# Create database directory if it doesn't exist
-db_dir = os.path.join(os.path.dirname(__file__), 'database')
-os.makedirs(db_dir, exist_ok=True)
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(db_dir, 'app.db')}"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db.init_app(app)
-with app.app_context():
-    db.create_all()
+    app.register_blueprint(health_bp, url_prefix='/api')
+    app.register_blueprint(user_bp, url_prefix='/api')
+    app.register_blueprint(research_bp, url_prefix='/api')
+    app.add_url_rule('/', 'serve', serve, defaults={'path': ''})
+    app.add_url_rule('/<path:path>', 'serve', serve)
+
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config.update(config or {})
+    if 'SQLALCHEMY_DATABASE_URI' not in app.config:
+        # Create database directory if it doesn't exist
+        db_dir = os.path.join(os.path.dirname(__file__), 'database')
+        os.makedirs(db_dir, exist_ok=True)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(db_dir, 'app.db')}"
+    db.init_app(app)
+
+    @app.cli.command('init-db')
+    def init_db():
+        """Create database tables."""
+        db.create_all()
+
+    # Cancel tasks whose clients have all gone away
+    start_idle_reaper(socketio)
+
+    if os.environ.get('PREWARM_AGENT', '').lower() in ('1', 'true', 'yes'):
+        socketio.start_background_task(load_agent_class, socketio)
+
+    return app
 
 # WebSocket event handlers
 @socketio.on('connect')
@@ -46,6 +72,7 @@ def handle_connect():
 
 @socketio.on('disconnect')
 def handle_disconnect():
+    unsubscribe_client_everywhere(request.sid)
     print('Client disconnected')
 
 @socketio.on('join_task')
@@ -53,6 +80,7 @@ def handle_join_task(data):
     task_id = data.get('task_id')
     if task_id:
         join_room(task_id)
+        subscribe_client(task_id, request.sid)
         print(f'Client joined task room: {task_id}')
 
 @socketio.on('leave_task')
@@ -60,12 +88,11 @@ def handle_leave_task(data):
     task_id = data.get('task_id')
     if task_id:
         leave_room(task_id)
+        unsubscribe_client(task_id, request.sid)
         print(f'Client left task room: {task_id}')
 
-@app.route('/', defaults={'path': ''})
-@app.route('/<path:path>')
 def serve(path):
-    static_folder_path = app.static_folder
+    static_folder_path = current_app.static_folder
     if static_folder_path is None:
             return "Static folder not configured", 404
 
@@ -80,6 +107,7 @@ def serve(path):
 
 
 if __name__ == '__main__':
+    app = create_app()
     port = int(os.environ.get('PORT', 5000))
     debug_mode = os.environ.get('FLASK_ENV') != 'production'
     socketio.run(app, host='0.0.0.0', port=port, debug=debug_mode, allow_unsafe_werkzeug=True)
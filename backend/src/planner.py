@@ -0,0 +1,175 @@
+import os
+import re
+
+# Per-task cost budget
+MAX_SEARCHES = int(os.environ.get('RESEARCH_MAX_SEARCHES', 8))
+MAX_SCRAPES = int(os.environ.get('RESEARCH_MAX_SCRAPES', 8))
+MAX_LLM_TOKENS = int(os.environ.get('RESEARCH_MAX_LLM_TOKENS', 40000))
+# Tokens held back so the final report can always be compiled
+REPORT_TOKEN_RESERVE = int(os.environ.get('RESEARCH_REPORT_TOKEN_RESERVE', 8000))
+# Rough cost of summarizing one scraped page (2000 chars of content plus prompt and answer)
+SUMMARY_TOKENS = 1000
+
+# Search depth: one results page is parsed WIDE_RESULTS deep, and the best
+# INITIAL_RESULTS of those are used
+INITIAL_RESULTS = 3
+WIDE_RESULTS = 6
+
+# Coverage thresholds (fraction of a question's key terms found in a text)
+SNIPPET_COVERAGE = 0.8        # snippets together answer the sub-question, skip scraping
+GOOD_SNIPPET_COVERAGE = 0.6   # a single snippet is good enough to stand in for its page
+WEAK_RELEVANCE = 0.3          # best result below this means the search should be widened
+COVERED_THRESHOLD = 0.9       # findings so far already cover a sub-question, skip it
+MIN_UNIQUE_TERMS = 2          # fewer terms than this is too little signal to skip a sub-question
+MIN_SNIPPET_CHARS = 120
+
+STOPWORDS = {
+    'the', 'and', 'for', 'are', 'what', 'which', 'who', 'how', 'why', 'when', 'where',
+    'with', 'from', 'that', 'this', 'these', 'those', 'their', 'there', 'about', 'into',
+    'including', 'include', 'does', 'did', 'have', 'has', 'been', 'was', 'were', 'will',
+    'can', 'could', 'should', 'would', 'main', 'key', 'some', 'any', 'all', 'its', 'our',
+    'your', 'they', 'them', 'than', 'then', 'also', 'such', 'most', 'more', 'over', 'between',
+    'generate', 'report', 'analyze', 'research', 'current', 'recent', 'state', 'information',
+}
+
+
+def key_terms(text):
+    """Significant lowercase words of a question or passage"""
+    words = re.findall(r'[a-z0-9][a-z0-9\-]+', text.lower())
+    # Crude plural folding so "diamonds" matches "diamond"
+    return {w[:-1] if len(w) > 4 and w.endswith('s') else w
+            for w in words if len(w) >= 3 and w not in STOPWORDS}
+
+
+def coverage(terms, text):
+    """Fraction of terms that appear in text"""
+    if not terms:
+        return 1.0
+    return len(terms & key_terms(text)) / len(terms)
+
+
+def estimate_tokens(text):
+    """Rough token count used when the API doesn't report usage"""
+    return len(text) // 4 + 1
+
+
+class ResearchBudget:
+    """Tracks how many searches, scrapes and LLM tokens a task has spent"""
+
+    def __init__(self, max_searches=MAX_SEARCHES, max_scrapes=MAX_SCRAPES,
+                 max_llm_tokens=MAX_LLM_TOKENS, report_reserve=REPORT_TOKEN_RESERVE):
+        self.max_searches = max_searches
+        self.max_scrapes = max_scrapes
+        self.max_llm_tokens = max_llm_tokens
+        self.report_reserve = report_reserve
+        self.searches = 0
+        self.scrapes = 0
+        self.llm_tokens = 0
+
+    def can_search(self):
+        return self.searches < self.max_searches
+
+    def can_scrape(self):
+        return self.scrapes < self.max_scrapes
+
+    def can_summarize(self):
+        """Whether a page summary fits without eating into the report reserve"""
+        limit = self.max_llm_tokens - self.report_reserve
+        return self.llm_tokens + SUMMARY_TOKENS <= limit
+
+    def record_search(self):
+        self.searches += 1
+
+    def record_scrape(self):
+        self.scrapes += 1
+
+    def record_llm(self, tokens):
+        self.llm_tokens += tokens
+
+    def to_dict(self):
+        return {
+            'searches': self.searches,
+            'scrapes': self.scrapes,
+            'llm_tokens': self.llm_tokens
+        }
+
+
+class AdaptivePlanner:
+    """Decides how much work each sub-question deserves"""
+
+    def __init__(self, budget):
+        self.budget = budget
+
+    def max_sub_questions(self, query):
+        """Simple, narrow queries get fewer sub-questions than broad ones"""
+        terms = len(key_terms(query))
+        if terms <= 3:
+            wanted = 2
+        elif terms <= 7:
+            wanted = 3
+        else:
+            wanted = 5
+        # Every sub-question needs at least one search
+        return max(1, min(wanted, self.budget.max_searches))
+
+    def is_covered(self, sub_question, findings, query=''):
+        """True if real findings gathered so far already answer this sub-question.
+
+        Only the terms a sub-question adds beyond the main query are compared,
+        and synthetic findings (fallback data, error notes) are ignored since
+        they echo the question back.
+        """
+        terms = key_terms(sub_question) - key_terms(query)
+        if len(terms) < MIN_UNIQUE_TERMS:
+            return False
+        text = ' '.join(f['summary'] for f in findings if not f.get('synthetic'))
+        if not text:
+            return False
+        return coverage(terms, text) >= COVERED_THRESHOLD
+
+    def relevance(self, sub_question, result):
+        return coverage(key_terms(sub_question), f"{result['title']} {result.get('snippet', '')}")
+
+    def is_weak(self, sub_question, results):
+        """Real results that are only loosely related; worth a reformulated search"""
+        real = [r for r in results if not r.get('fallback')]
+        if not real:
+            # Engines are failing; another request won't do better
+            return False
+        return max(self.relevance(sub_question, r) for r in real) < WEAK_RELEVANCE
+
+    def reformulate(self, sub_question, query=''):
+        """Keyword-only search for a weak sub-question, or None if it wouldn't differ.
+
+        Drops question words and filler so the engine matches on the terms the
+        sub-question adds, followed by the main-query terms for context.
+        """
+        unique = key_terms(sub_question) - key_terms(query)
+        shared = key_terms(sub_question) & key_terms(query)
+        words = sorted(unique) + sorted(shared)
+        reformulated = ' '.join(words)
+        if not words or reformulated.lower() == sub_question.strip().lower():
+            return None
+        return reformulated
+
+    def snippets_answer(self, sub_question, results):
+        """True when the search snippets alone cover the sub-question"""
+        snippets = ' '.join(r.get('snippet', '') for r in results)
+        if len(snippets) < MIN_SNIPPET_CHARS * 2:
+            return False
+        return coverage(key_terms(sub_question), snippets) >= SNIPPET_COVERAGE
+
+    def snippet_is_enough(self, sub_question, result):
+        snippet = result.get('snippet', '')
+        return (len(snippet) >= MIN_SNIPPET_CHARS
+                and coverage(key_terms(sub_question), snippet) >= GOOD_SNIPPET_COVERAGE)
+
+    def rank(self, sub_question, results, limit=INITIAL_RESULTS):
+        """Most relevant results first, capped at limit"""
+        ranked = sorted(results, key=lambda r: self.relevance(sub_question, r), reverse=True)
+        return ranked[:limit]
+
+    def merge(self, results, more):
+        """Combine two result lists, dropping duplicate URLs"""
+        seen = {r['url'] for r in results}
+        return results + [r for r in more if r['url'] not in seen]
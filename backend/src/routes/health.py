@@ -0,0 +1,19 @@
+from flask import Blueprint, jsonify
+from src.routes.research import active_tasks, agent_loaded, FINISHED_STATUSES
+
+health_bp = Blueprint('health', __name__)
+
+@health_bp.route('/health', methods=['GET'])
+def health():
+    """Liveness check; never touches the agent stack or the database"""
+    return jsonify({'status': 'ok'}), 200
+
+@health_bp.route('/status', methods=['GET'])
+def service_status():
+    """Service status: running tasks and whether the agent stack is loaded yet"""
+    running = sum(1 for task in list(active_tasks.values()) if task['agent'].status not in FINISHED_STATUSES)
+    return jsonify({
+        'status': 'ok',
+        'agent_loaded': agent_loaded(),
+        'active_tasks': running
+    }), 200
@@ -1,13 +1,106 @@
-from flask import Blueprint, request, jsonify, Response
+from flask import Blueprint, request, jsonify, Response, current_app
 from flask_socketio import emit
+import os
 import uuid
 import threading
-from src.agent import ResearchAgent
+import time
 
 research_bp = Blueprint('research', __name__)
 
 # Store active research tasks
 active_tasks = {}
+tasks_lock = threading.Lock()
+
+# The agent pulls in the Gemini SDK, requests and BeautifulSoup, so it is only
+# imported when the first task starts (or when pre-warmed at startup)
+_agent_class = None
+_agent_lock = threading.Lock()
+
+_reaper_started = False
+_reaper_lock = threading.Lock()
+
+# Cancel a running task once no client has joined its room or polled its status
+# for this many seconds (0 disables)
+IDLE_TIMEOUT = float(os.environ.get('RESEARCH_IDLE_TIMEOUT', 120))
+IDLE_CHECK_INTERVAL = 10
+FINISHED_STATUSES = ('completed', 'error', 'cancelled', 'timeout')
+
+def load_agent_class(socketio):
+    """Import the research agent stack on first use and return ResearchAgent"""
+    global _agent_class
+    with _agent_lock:
+        if _agent_class is None:
+            from src.agent import ResearchAgent, set_socketio
+            set_socketio(socketio)
+            _agent_class = ResearchAgent
+        return _agent_class
+
+def agent_loaded():
+    return _agent_class is not None
+
+def subscribe_client(task_id, sid):
+    """Record that a socket client joined a task room"""
+    with tasks_lock:
+        task = active_tasks.get(task_id)
+        if task:
+            task['subscribers'].add(sid)
+
+def unsubscribe_client(task_id, sid):
+    """Record that a socket client left a task room"""
+    with tasks_lock:
+        task = active_tasks.get(task_id)
+        if task and sid in task['subscribers']:
+            task['subscribers'].discard(sid)
+            if not task['subscribers']:
+                task['idle_since'] = time.monotonic()
+
+def unsubscribe_client_everywhere(sid):
+    """Drop a disconnected client from every task room it had joined"""
+    with tasks_lock:
+        task_ids = [task_id for task_id, task in active_tasks.items() if sid in task['subscribers']]
+    for task_id in task_ids:
+        unsubscribe_client(task_id, sid)
+
+def touch_task(task_id):
+    """Record REST activity on a task; polling /status counts as watching it"""
+    with tasks_lock:
+        task = active_tasks.get(task_id)
+        if task:
+            task['idle_since'] = time.monotonic()
+
+def cancel_idle_tasks():
+    """Cancel running tasks that nobody has subscribed to or polled for IDLE_TIMEOUT"""
+    if not IDLE_TIMEOUT:
+        return []
+    now = time.monotonic()
+    with tasks_lock:
+        idle = [
+            task['agent'] for task in active_tasks.values()
+            if not task['subscribers']
+            and task['agent'].status not in FINISHED_STATUSES
+            and now - task['idle_since'] >= IDLE_TIMEOUT
+        ]
+    return [agent.task_id for agent in idle if agent.cancel('abandoned')]
+
+def start_idle_reaper(socketio):
+    """Start the idle task reaper once per process, however many apps are created"""
+    global _reaper_started
+    with _reaper_lock:
+        if _reaper_started:
+            return False
+        _reaper_started = True
+    socketio.start_background_task(run_idle_reaper, socketio)
+    return True
+
+def run_idle_reaper(socketio):
+    """Background loop that periodically cancels abandoned tasks"""
+    while True:
+        socketio.sleep(IDLE_CHECK_INTERVAL)
+        try:
+            for task_id in cancel_idle_tasks():
+                print(f"Cancelled abandoned task: {task_id}")
+        except Exception as e:
+            print(f"Idle task check failed: {e}")
 
 @research_bp.route('/research', methods=['POST'])
 def start_research():
@@ -23,12 +116,17 @@ def start_research():
         task_id = str(uuid.uuid4())
         
         # Create research agent
+        ResearchAgent = load_agent_class(current_app.extensions['socketio'])
         agent = ResearchAgent(task_id)
-        active_tasks[task_id] = {
-            'agent': agent,
-            'status': 'started',
-            'query': query
-        }
+        with tasks_lock:
+            active_tasks[task_id] = {
+                'agent': agent,
+                'status': 'started',
+                'query': query,
+                'subscribers': set(),
+                # The idle clock starts now so the client has time to join the room
+                'idle_since': time.monotonic()
+            }
         
         # Start research in background thread
         thread = threading.Thread(target=agent.research, args=(query,))
@@ -47,6 +145,7 @@ def get_status(task_id):
         if task_id not in active_tasks:
             return jsonify({'error': 'Task not found'}), 404
         
+        touch_task(task_id)
         task = active_tasks[task_id]
         agent = task['agent']
         
@@ -55,7 +154,8 @@ def get_status(task_id):
             'status': agent.status,
             'thoughts': agent.thoughts,
             'report': agent.report,
-            'progress': agent.progress
+            'progress': agent.progress,
+            'cost': agent.budget.to_dict()
         }), 200
         
     except Exception as e:
@@ -68,6 +168,7 @@ def download_report(task_id):
         if task_id not in active_tasks:
             return jsonify({'error': 'Task not found'}), 404
         
+        touch_task(task_id)
         task = active_tasks[task_id]
         agent = task['agent']
         
@@ -83,3 +184,21 @@ def download_report(task_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@research_bp.route('/research/<task_id>', methods=['DELETE'])
+def cancel_research(task_id):
+    """Cancel a running research task"""
+    try:
+        if task_id not in active_tasks:
+            return jsonify({'error': 'Task not found'}), 404
+        
+        agent = active_tasks[task_id]['agent']
+        
+        if agent.status in FINISHED_STATUSES:
+            return jsonify({'error': f'Task already {agent.status}'}), 409
+        
+        agent.cancel('cancelled by client')
+        
+        return jsonify({'task_id': task_id, 'status': 'cancelling'}), 202
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
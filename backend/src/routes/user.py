@@ -1,8 +1,15 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, current_app
 from src.models.user import User, db
 
 user_bp = Blueprint('user', __name__)
 
+@user_bp.before_request
+def ensure_tables():
+    """Create the user tables on first use instead of at worker startup"""
+    if not current_app.extensions.get('user_tables_created'):
+        db.create_all()
+        current_app.extensions['user_tables_created'] = True
+
 @user_bp.route('/users', methods=['GET'])
 def get_users():
     users = User.query.all()
@@ -4,14 +4,32 @@ import time
 import random
 from urllib.parse import quote_plus, urljoin, urlparse
 import re
+from src.documents import DocumentExtractor, DocumentExtractionError, detect_kind
 
 class SearchEngine:
-    def __init__(self):
+    def __init__(self, cancel_token=None, budget=None):
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
         self.session = requests.Session()
         self.session.headers.update(self.headers)
+        self.cancel_token = cancel_token
+        self.budget = budget
+        if cancel_token:
+            # Release pooled connections once the task is cancelled. This does not interrupt a
+            # request that is already running; callers wrap us in CancelToken.call for that.
+            cancel_token.on_cancel(self.session.close)
+    
+    def _timeout(self, default):
+        """Request timeout, clamped to the task's remaining time when cancellable"""
+        if self.cancel_token:
+            return self.cancel_token.timeout(default)
+        return default
+    
+    def _record_search(self):
+        """Charge one search engine request to the task budget"""
+        if self.budget:
+            self.budget.record_search()
     
     def search_duckduckgo(self, query, num_results=5):
         """Search using DuckDuckGo (more reliable than Google for scraping)"""
@@ -19,7 +37,8 @@ class SearchEngine:
             # DuckDuckGo HTML search
             search_url = f"https://html.duckduckgo.com/html/?q={quote_plus(query)}"
             
-            response = self.session.get(search_url, timeout=10)
+            self._record_search()
+            response = self.session.get(search_url, timeout=self._timeout(10))
             response.raise_for_status()
             
             soup = BeautifulSoup(response.content, 'html.parser')
@@ -63,7 +82,8 @@ class SearchEngine:
         try:
             search_url = f"https://www.bing.com/search?q={quote_plus(query)}"
             
-            response = self.session.get(search_url, timeout=10)
+            self._record_search()
+            response = self.session.get(search_url, timeout=self._timeout(10))
             response.raise_for_status()
             
             soup = BeautifulSoup(response.content, 'html.parser')
@@ -114,7 +134,9 @@ class SearchEngine:
         results = self.search_duckduckgo(query, num_results)
         
         # If no results, try Bing
-        if not results:
+        if not results and (not self.budget or self.budget.can_search()):
+            if self.cancel_token:
+                self.cancel_token.check()
             print("DuckDuckGo failed, trying Bing...")
             results = self.search_bing(query, num_results)
         
@@ -127,51 +149,74 @@ class SearchEngine:
         return results
     
     def _fallback_search_results(self, query):
-        """Fallback search results when real search fails"""
+        """Fallback search results when real search fails (marked so they aren't taken as evidence)"""
         return [
             {
                 'title': f"Market Analysis: {query}",
                 'url': "https://www.example.com/market-analysis",
-                'snippet': f"Comprehensive market analysis and trends for {query}. Industry insights, key players, and growth projections."
+                'snippet': f"Comprehensive market analysis and trends for {query}. Industry insights, key players, and growth projections.",
+                'fallback': True
             },
             {
                 'title': f"Industry Report: {query}",
                 'url': "https://www.example.com/industry-report",
-                'snippet': f"Latest industry report covering {query}. Market size, competitive landscape, and future outlook."
+                'snippet': f"Latest industry report covering {query}. Market size, competitive landscape, and future outlook.",
+                'fallback': True
             },
             {
                 'title': f"Research Study: {query}",
                 'url': "https://www.example.com/research-study",
-                'snippet': f"In-depth research study on {query}. Data analysis, expert opinions, and strategic recommendations."
+                'snippet': f"In-depth research study on {query}. Data analysis, expert opinions, and strategic recommendations.",
+                'fallback': True
             }
         ]
 
 class WebScraper:
-    def __init__(self):
+    def __init__(self, cancel_token=None):
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
         self.session = requests.Session()
         self.session.headers.update(self.headers)
+        self.cancel_token = cancel_token
+        if cancel_token:
+            # Release pooled connections once the task is cancelled. This does not interrupt a
+            # request that is already running; callers wrap us in CancelToken.call for that.
+            cancel_token.on_cancel(self.session.close)
+        self.document_extractor = DocumentExtractor(cancel_token=cancel_token)
+    
+    def _timeout(self, default):
+        """Request timeout, clamped to the task's remaining time when cancellable"""
+        if self.cancel_token:
+            return self.cancel_token.timeout(default)
+        return default
     
     def scrape_url(self, url, max_length=3000):
         """Scrape content from a URL"""
         try:
             print(f"Scraping: {url}")
             
-            # Skip certain file types
-            if any(url.lower().endswith(ext) for ext in ['.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx']):
+            # Skip legacy binary Office formats
+            if any(url.lower().endswith(ext) for ext in ['.doc', '.xls', '.ppt']):
                 return f"Document file detected: {url}. Content extraction not available for this file type."
             
-            response = self.session.get(url, timeout=15, allow_redirects=True)
+            response = self.session.get(url, timeout=self._timeout(15), allow_redirects=True, stream=True)
+            if response.status_code >= 400:
+                # Streamed responses hold their connection until closed
+                response.close()
             response.raise_for_status()
             
-            # Check content type
+            # Check content type before downloading the body
             content_type = response.headers.get('content-type', '').lower()
             if 'text/html' not in content_type:
-                return f"Non-HTML content detected: {content_type}. Content extraction not available."
+                kind = detect_kind(url, content_type)
+                if not kind:
+                    response.close()
+                    return f"Non-HTML content detected: {content_type}. Content extraction not available."
+                content_text = self.document_extractor.extract_response(response, kind)
+                return self._clean_text(content_text, url, max_length)
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+            soup = BeautifulSoup(self._read_body(response), 'html.parser')
             
             # Remove script and style elements
             for script in soup(["script", "style", "nav", "header", "footer", "aside"]):
@@ -200,18 +245,10 @@ class WebScraper:
             if not content_text:
                 content_text = soup.get_text()
             
-            # Clean up the text
-            content_text = re.sub(r'\s+', ' ', content_text).strip()
-            
-            # Limit length
-            if len(content_text) > max_length:
-                content_text = content_text[:max_length] + "..."
-            
-            if not content_text:
-                return f"No readable content found at {url}"
-            
-            return content_text
+            return self._clean_text(content_text, url, max_length)
             
+        except DocumentExtractionError as e:
+            return f"Could not extract document {url}: {str(e)}"
         except requests.exceptions.Timeout:
             return f"Timeout error when accessing {url}"
         except requests.exceptions.RequestException as e:
@@ -219,6 +256,29 @@ class WebScraper:
         except Exception as e:
             return f"Error scraping {url}: {str(e)}"
     
+    def _clean_text(self, content_text, url, max_length):
+        """Collapse whitespace and limit length of extracted text"""
+        content_text = re.sub(r'\s+', ' ', content_text).strip()
+        
+        # Limit length
+        if len(content_text) > max_length:
+            content_text = content_text[:max_length] + "..."
+        
+        if not content_text:
+            return f"No readable content found at {url}"
+        
+        return content_text
+    
+    def _read_body(self, response, chunk_size=65536):
+        """Read a streamed response, stopping between chunks if the task is cancelled"""
+        body = bytearray()
+        with response:
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                if self.cancel_token:
+                    self.cancel_token.check()
+                body.extend(chunk)
+        return bytes(body)
+    
     def scrape_multiple_urls(self, urls, delay=1):
         """Scrape multiple URLs with delay between requests"""
         results = []
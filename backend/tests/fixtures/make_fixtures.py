@@ -0,0 +1,94 @@
+"""Regenerate the small document fixtures used by test_documents.py.
+
+    python tests/fixtures/make_fixtures.py
+"""
+import os
+import zipfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+S_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+P_NS = 'http://schemas.openxmlformats.org/presentationml/2006/main'
+A_NS = 'http://schemas.openxmlformats.org/drawingml/2006/main'
+
+
+def write_zip(name, parts):
+    with zipfile.ZipFile(os.path.join(HERE, name), 'w', zipfile.ZIP_DEFLATED) as archive:
+        for part, content in parts.items():
+            archive.writestr(part, content)
+
+
+def make_docx():
+    paragraphs = ['Lab-grown diamond market overview', 'Key players include Diamond Foundry and WD Lab Grown.']
+    body = ''.join(f'<w:p><w:r><w:t>{p}</w:t></w:r></w:p>' for p in paragraphs)
+    write_zip('sample.docx', {
+        '[Content_Types].xml': '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types"/>',
+        'word/document.xml': f'<w:document xmlns:w="{W_NS}"><w:body>{body}</w:body></w:document>',
+    })
+
+
+def make_xlsx():
+    write_zip('sample.xlsx', {
+        '[Content_Types].xml': '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types"/>',
+        'xl/sharedStrings.xml': f'<sst xmlns="{S_NS}"><si><t>Company</t></si><si><t>Revenue</t></si><si><t>Acme Gems</t></si></sst>',
+        'xl/worksheets/sheet1.xml': (
+            f'<worksheet xmlns="{S_NS}"><sheetData>'
+            '<row><c t="s"><v>0</v></c><c t="s"><v>1</v></c></row>'
+            '<row><c t="s"><v>2</v></c><c><v>1200</v></c></row>'
+            '</sheetData></worksheet>'
+        ),
+        'xl/worksheets/sheet2.xml': (
+            f'<worksheet xmlns="{S_NS}"><sheetData>'
+            '<row><c t="inlineStr"><is><t>Second sheet</t></is></c></row>'
+            '</sheetData></worksheet>'
+        ),
+    })
+
+
+def make_pptx():
+    def slide(text):
+        return (f'<p:sld xmlns:p="{P_NS}" xmlns:a="{A_NS}"><p:cSld><p:spTree><p:sp><p:txBody>'
+                f'<a:p><a:r><a:t>{text}</a:t></a:r></a:p></p:txBody></p:sp></p:spTree></p:cSld></p:sld>')
+    write_zip('sample.pptx', {
+        '[Content_Types].xml': '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types"/>',
+        'ppt/slides/slide1.xml': slide('Slide one: market size'),
+        'ppt/slides/slide2.xml': slide('Slide two: funding rounds'),
+    })
+
+
+def make_pdf():
+    """A three-page PDF with one line of Helvetica text per page"""
+    texts = ['Page one: market trends', 'Page two: key players', 'Page three: challenges']
+    page_ids = [3 + 2 * i for i in range(len(texts))]
+    font_id = 3 + 2 * len(texts)
+    objects = {
+        1: '<< /Type /Catalog /Pages 2 0 R >>',
+        2: f"<< /Type /Pages /Kids [{' '.join(f'{i} 0 R' for i in page_ids)}] /Count {len(texts)} >>",
+        font_id: '<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>',
+    }
+    for page_id, text in zip(page_ids, texts):
+        stream = f'BT /F1 12 Tf 72 720 Td ({text}) Tj ET'
+        objects[page_id] = (f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] '
+                            f'/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {page_id + 1} 0 R >>')
+        objects[page_id + 1] = f'<< /Length {len(stream)} >>\nstream\n{stream}\nendstream'
+
+    out = b'%PDF-1.4\n'
+    offsets = {}
+    for obj_id in sorted(objects):
+        offsets[obj_id] = len(out)
+        out += f'{obj_id} 0 obj\n{objects[obj_id]}\nendobj\n'.encode('latin-1')
+    xref = len(out)
+    out += f'xref\n0 {len(objects) + 1}\n0000000000 65535 f \n'.encode('latin-1')
+    for obj_id in sorted(objects):
+        out += f'{offsets[obj_id]:010d} 00000 n \n'.encode('latin-1')
+    out += f'trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n'.encode('latin-1')
+    with open(os.path.join(HERE, 'sample.pdf'), 'wb') as f:
+        f.write(out)
+
+
+if __name__ == '__main__':
+    make_docx()
+    make_xlsx()
+    make_pptx()
+    make_pdf()
@@ -0,0 +1,43 @@
+from src.agent import ResearchAgent
+from src.cancellation import StageTimeout
+
+
+def make_agent(monkeypatch):
+    monkeypatch.setenv('GEMINI_API_KEY', 'test-key')
+    return ResearchAgent('task')
+
+
+def test_report_timeout_keeps_findings(monkeypatch):
+    agent = make_agent(monkeypatch)
+
+    def too_slow(prompt):
+        raise StageTimeout('report')
+
+    monkeypatch.setattr(agent, 'generate', too_slow)
+    findings = [
+        {'source': 'Diamond Weekly', 'url': 'https://x.com/a', 'summary': 'Prices fell 20% in 2024.'},
+        {'source': 'Fallback Data', 'url': 'N/A', 'summary': 'Unable to find anything.', 'synthetic': True},
+    ]
+    report = agent.compile_report('lab-grown diamonds', ['Where are prices heading?'], findings)
+
+    assert 'Where are prices heading?' in report
+    assert 'Prices fell 20% in 2024.' in report
+    assert 'https://x.com/a' in report
+    assert 'Unable to find anything.' not in report
+
+
+def test_research_completes_when_report_stage_times_out(monkeypatch):
+    agent = make_agent(monkeypatch)
+    monkeypatch.setattr(agent, 'break_down_query', lambda query: ['Where are prices heading?'])
+    monkeypatch.setattr(agent, 'research_sub_question', lambda sub_question, query: [
+        {'source': 'Diamond Weekly', 'url': 'https://x.com/a', 'summary': 'Prices fell 20% in 2024.'}
+    ])
+
+    def too_slow(prompt):
+        raise StageTimeout('report')
+
+    monkeypatch.setattr(agent, 'generate', too_slow)
+    agent.research('lab-grown diamonds')
+
+    assert agent.status == 'completed'
+    assert 'Prices fell 20% in 2024.' in agent.report
@@ -0,0 +1,56 @@
+import sys
+
+import pytest
+from flask import Flask
+
+from src import main
+from src.models.user import db
+from src.routes import research
+from src.routes.user import user_bp
+
+
+@pytest.fixture
+def background_tasks(monkeypatch):
+    """Record background tasks instead of starting real threads"""
+    started = []
+    monkeypatch.setattr(research, '_reaper_started', False)
+    monkeypatch.setattr(main.socketio, 'start_background_task', lambda fn, *args: started.append(fn))
+    return started
+
+
+def test_health_and_status_do_not_load_agent(monkeypatch, tmp_path, background_tasks):
+    # Other tests import the agent; start from a process where it isn't loaded
+    monkeypatch.delitem(sys.modules, 'src.agent', raising=False)
+    monkeypatch.setattr(research, '_agent_class', None)
+
+    app = main.create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'app.db'}"})
+    client = app.test_client()
+    assert client.get('/api/health').get_json() == {'status': 'ok'}
+    status = client.get('/api/status').get_json()
+    assert status['status'] == 'ok'
+    assert status['agent_loaded'] is False
+    assert status['active_tasks'] == 0
+    assert 'src.agent' not in sys.modules
+
+
+def test_idle_reaper_starts_once_per_process(tmp_path, background_tasks):
+    config = {'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'app.db'}"}
+    main.create_app(config)
+    main.create_app(config)
+    assert background_tasks == [research.run_idle_reaper]
+
+
+def make_user_app(db_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{db_path}"
+    db.init_app(app)
+    app.register_blueprint(user_bp, url_prefix='/api')
+    return app
+
+
+def test_user_tables_created_for_each_app(tmp_path):
+    for name in ('first.db', 'second.db'):
+        client = make_user_app(tmp_path / name).test_client()
+        response = client.post('/api/users', json={'username': 'ada', 'email': 'ada@example.com'})
+        assert response.status_code == 201
+        assert client.get('/api/users').get_json()[0]['username'] == 'ada'
@@ -0,0 +1,53 @@
+import threading
+import time
+
+import pytest
+
+from src.cancellation import CancelToken, StageTimeout, TaskCancelled
+
+
+def test_call_returns_result():
+    token = CancelToken()
+    assert token.call(lambda x: x * 2, 21) == 42
+
+
+def test_call_stops_waiting_when_cancelled():
+    token = CancelToken()
+    threading.Timer(0.1, token.cancel, args=('cancelled by client',)).start()
+    start = time.monotonic()
+    with pytest.raises(TaskCancelled) as excinfo:
+        token.call(time.sleep, 5)
+    assert time.monotonic() - start < 1
+    assert excinfo.value.reason == 'cancelled by client'
+
+
+def test_task_deadline_cancels_with_timeout_reason():
+    token = CancelToken(timeout=0.1)
+    with pytest.raises(TaskCancelled) as excinfo:
+        token.call(time.sleep, 5)
+    assert excinfo.value.reason == 'timeout'
+    assert token.cancelled
+
+
+def test_stage_timeout_leaves_task_alive():
+    token = CancelToken()
+    with token.stage_limit('research', 0.1):
+        with pytest.raises(StageTimeout):
+            token.call(time.sleep, 5)
+    assert not token.cancelled
+    token.check()
+
+
+def test_timeout_is_clamped_to_deadline():
+    token = CancelToken(timeout=2)
+    assert token.timeout(15) <= 2
+    assert CancelToken().timeout(15) == 15
+
+
+def test_on_cancel_runs_callbacks_once():
+    token = CancelToken()
+    calls = []
+    token.on_cancel(lambda: calls.append(1))
+    assert token.cancel()
+    assert not token.cancel()
+    assert calls == [1]
@@ -0,0 +1,170 @@
+import io
+import os
+from concurrent.futures import Future
+
+import pytest
+import requests
+
+from src import documents
+from src.documents import DocumentExtractionError, DocumentExtractor, detect_kind
+from src.search import WebScraper
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def fixture(name):
+    return os.path.join(FIXTURES, name)
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    documents._cache.clear()
+    yield
+    documents._cache.clear()
+
+
+@pytest.mark.parametrize('name, expected', [
+    ('sample.docx', 'Key players include Diamond Foundry'),
+    ('sample.xlsx', 'Acme Gems | 1200'),
+    ('sample.pptx', 'Slide two: funding rounds'),
+    ('sample.pdf', 'Page three: challenges'),
+])
+def test_extract_file(name, expected):
+    assert expected in DocumentExtractor().extract_file(fixture(name))
+
+
+def test_detect_kind_prefers_content_type():
+    assert detect_kind('https://x.com/report', 'application/pdf; charset=binary') == 'pdf'
+    assert detect_kind('https://x.com/deck.pptx?dl=1', 'application/octet-stream') == 'pptx'
+    assert detect_kind('https://x.com/image', 'image/png') is None
+
+
+def test_size_limit():
+    with pytest.raises(DocumentExtractionError, match='larger than'):
+        DocumentExtractor(max_bytes=100).extract_file(fixture('sample.pdf'))
+
+
+def test_page_limit():
+    text = DocumentExtractor(max_pages=1).extract_file(fixture('sample.pdf'))
+    assert 'Page one' in text
+    assert 'Page two' not in text
+
+    text = DocumentExtractor(max_pages=1).extract_file(fixture('sample.pptx'))
+    assert 'Slide one' in text
+    assert 'Slide two' not in text
+
+    text = DocumentExtractor(max_pages=1).extract_file(fixture('sample.xlsx'))
+    assert 'Second sheet' not in text
+
+
+def test_char_limit():
+    assert DocumentExtractor(max_chars=8).extract_file(fixture('sample.docx')) == 'Lab-grow'
+
+
+def test_malformed_zip(tmp_path):
+    path = tmp_path / 'broken.docx'
+    path.write_bytes(b'PK\x03\x04 not really a zip')
+    with pytest.raises(DocumentExtractionError, match='malformed docx'):
+        DocumentExtractor().extract_file(str(path))
+
+
+def test_cache_hit_skips_the_pool(monkeypatch):
+    extractor = DocumentExtractor()
+    first = extractor.extract_file(fixture('sample.docx'))
+
+    def fail(*args):
+        raise AssertionError("pool used despite cache hit")
+
+    monkeypatch.setattr(DocumentExtractor, '_run_in_pool', fail)
+    assert extractor.extract_file(fixture('sample.docx')) == first
+
+
+def make_response(url, content_type, body, status=200):
+    response = requests.Response()
+    response.status_code = status
+    response.url = url
+    response.headers['content-type'] = content_type
+    response.raw = io.BytesIO(body)
+    return response
+
+
+class FakeSession:
+    def __init__(self, response):
+        self.response = response
+
+    def get(self, url, **kwargs):
+        return self.response
+
+
+def scrape(response):
+    scraper = WebScraper()
+    scraper.session = FakeSession(response)
+    return scraper.scrape_url(response.url)
+
+
+def test_scrape_url_html():
+    body = b'<html><body><nav>menu</nav><article>Diamond market grows</article></body></html>'
+    assert scrape(make_response('https://x.com/a', 'text/html', body)) == 'Diamond market grows'
+
+
+def test_scrape_url_routes_pdf_by_content_type():
+    with open(fixture('sample.pdf'), 'rb') as f:
+        body = f.read()
+    text = scrape(make_response('https://x.com/download?id=1', 'application/pdf', body))
+    assert 'Page two: key players' in text
+
+
+def test_scrape_url_routes_docx_by_extension():
+    with open(fixture('sample.docx'), 'rb') as f:
+        body = f.read()
+    text = scrape(make_response('https://x.com/report.docx', 'application/octet-stream', body))
+    assert 'Lab-grown diamond market overview' in text
+
+
+def test_scrape_url_unsupported_content_type():
+    response = make_response('https://x.com/logo', 'image/png', b'\x89PNG')
+    assert scrape(response).startswith('Non-HTML content detected')
+    assert response.raw.closed
+
+
+def test_scrape_url_closes_response_on_http_error():
+    response = make_response('https://x.com/missing', 'text/html', b'gone', status=404)
+    assert scrape(response).startswith('Network error')
+    assert response.raw.closed
+
+
+def test_spawn_is_used_when_forkserver_is_unavailable(monkeypatch):
+    monkeypatch.setattr(documents.multiprocessing, 'get_all_start_methods', lambda: ['spawn'])
+    assert documents._start_method() == 'spawn'
+
+    monkeypatch.setattr(documents, '_pool', None)
+    try:
+        assert 'Diamond Foundry' in DocumentExtractor().extract_file(fixture('sample.docx'))
+        assert documents._pool._mp_context.get_start_method() == 'spawn'
+    finally:
+        documents._pool.shutdown()
+
+
+class StuckPool:
+    """Pool whose submitted work never finishes, like a runaway worker"""
+
+    def __init__(self):
+        self.shut_down = False
+
+    def submit(self, *args):
+        return Future()
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut_down = True
+
+
+def test_pool_is_retired_after_timeout_without_sigalrm(monkeypatch):
+    stuck = StuckPool()
+    monkeypatch.setattr(documents, 'HAS_ALARM', False)
+    monkeypatch.setattr(documents, '_pool', stuck)
+    # The grace period adds 5 seconds; this leaves a 0.1 s wait
+    extractor = DocumentExtractor(timeout=-4.9)
+    with pytest.raises(DocumentExtractionError, match='timed out'):
+        extractor.extract_file(fixture('sample.docx'))
+    assert stuck.shut_down
+    assert documents._pool is None
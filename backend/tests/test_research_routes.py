@@ -0,0 +1,85 @@
+import time
+
+import pytest
+from flask import Flask
+
+from src.routes import research
+
+
+class FakeBudget:
+    def to_dict(self):
+        return {}
+
+
+class FakeAgent:
+    def __init__(self, task_id):
+        self.task_id = task_id
+        self.status = 'running'
+        self.thoughts = []
+        self.report = ''
+        self.progress = 0
+        self.cancel_reason = None
+        self.budget = FakeBudget()
+
+    def cancel(self, reason='cancelled'):
+        if self.cancel_reason:
+            return False
+        self.cancel_reason = reason
+        return True
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.register_blueprint(research.research_bp, url_prefix='/api')
+    yield app.test_client()
+    research.active_tasks.clear()
+
+
+def add_task(task_id, idle_for=0):
+    agent = FakeAgent(task_id)
+    research.active_tasks[task_id] = {
+        'agent': agent,
+        'status': 'started',
+        'query': 'q',
+        'subscribers': set(),
+        'idle_since': time.monotonic() - idle_for
+    }
+    return agent
+
+
+def test_unwatched_task_is_cancelled(client, monkeypatch):
+    monkeypatch.setattr(research, 'IDLE_TIMEOUT', 60)
+    agent = add_task('t1', idle_for=61)
+    assert research.cancel_idle_tasks() == ['t1']
+    assert agent.cancel_reason == 'abandoned'
+
+
+def test_polling_status_keeps_task_alive(client, monkeypatch):
+    monkeypatch.setattr(research, 'IDLE_TIMEOUT', 60)
+    agent = add_task('t1', idle_for=61)
+    assert client.get('/api/status/t1').status_code == 200
+    assert research.cancel_idle_tasks() == []
+    assert agent.cancel_reason is None
+
+
+def test_subscribed_task_is_not_cancelled(client, monkeypatch):
+    monkeypatch.setattr(research, 'IDLE_TIMEOUT', 60)
+    add_task('t1', idle_for=61)
+    research.subscribe_client('t1', 'sid-1')
+    assert research.cancel_idle_tasks() == []
+    research.unsubscribe_client_everywhere('sid-1')
+    assert research.active_tasks['t1']['subscribers'] == set()
+
+
+def test_delete_cancels_running_task(client):
+    agent = add_task('t1')
+    response = client.delete('/api/research/t1')
+    assert response.status_code == 202
+    assert agent.cancel_reason == 'cancelled by client'
+
+
+def test_delete_finished_task_conflicts(client):
+    add_task('t1').status = 'completed'
+    assert client.delete('/api/research/t1').status_code == 409
+    assert client.delete('/api/research/missing').status_code == 404
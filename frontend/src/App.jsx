@@ -94,6 +94,14 @@ function App() {
       }
     })
 
+    socketRef.current.on('cancelled', (data) => {
+      if (data.task_id === taskId) {
+        setError(`Research stopped: ${data.reason}`)
+        setStatus('error')
+        setIsResearching(false)
+      }
+    })
+
     socketRef.current.on('disconnect', () => {
       console.log('Disconnected from server')
     })